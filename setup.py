@@ -2,7 +2,6 @@
 
 from setuptools import setup, find_packages
 from pathlib import Path
-import re
 
 # Read the contents of README file
 this_directory = Path(__file__).parent
@@ -21,10 +20,10 @@ if requirements_path.exists():
 version = "0.1.0"  # fallback
 version_file = this_directory / "src" / "meshtastic_mqtt_protobuf" / "__version__.py"
 if version_file.exists():
-    version_content = version_file.read_text(encoding="utf-8")
-    version_match = re.search(r'^__version__\s*=\s*[\'"]([^\'"]*)[\'"]', version_content, re.MULTILINE)
-    if version_match:
-        version = version_match.group(1)
+    for line in version_file.read_text(encoding="utf-8").splitlines():
+        if line.startswith("__version__"):
+            version = line.partition("=")[2].split("#")[0].strip().strip("'\"")
+            break
 
 setup(
     name="meshtastic-mqtt-protobuf",
@@ -34,7 +33,11 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/meshtastic-mqtt-protobuf",
-    packages=find_packages(where="src"),
+    packages=find_packages(
+        where="src",
+        include=["meshtastic_mqtt_protobuf", "meshtastic_mqtt_protobuf.*"],
+        exclude=["*.tests", "*.tests.*", "build*", "*.egg-info"],
+    ),
     package_dir={"": "src"},
     license="GPL-3.0-or-later",
     classifiers=[
@@ -54,6 +57,10 @@ setup(
     ],
     python_requires=">=3.7",
     install_requires=requirements,
+    extras_require={
+        # Optional zstd compression for MeshtasticMQTTClient.publish()
+        "zstd": ["zstandard>=0.18"],
+    },
     entry_points={
         "console_scripts": [
             "meshtastic-send-pb=meshtastic_mqtt_protobuf.cli:main",
@@ -52,7 +52,6 @@ attempts to disconnect from MQTT cleanly, even on error.
 import argparse
 import logging
 import sys
-import os
 
 from .config import Config
 from .message import build_protobuf_message, build_topic
@@ -271,18 +270,14 @@ def main():
         # Load configuration
         config = Config()
         
-        # Create default config if it doesn't exist
-        if not os.path.exists(config_path):
-            logger.info(f"Configuration file not found. Creating default config at: {config_path}")
-            Config.create_default_config(config_path)
-            logger.info("Please edit the configuration file with your MQTT credentials and gateway ID")
-            sys.exit(1)
-        
         try:
             config.load_from_file(config_path)
             logger.debug(f"Loaded configuration from: {config_path}")
         except FileNotFoundError:
-            logger.error(f"Configuration file not found: {config_path}")
+            # Create default config if it doesn't exist
+            logger.info(f"Configuration file not found. Creating default config at: {config_path}")
+            Config.create_default_config(config_path)
+            logger.info("Please edit the configuration file with your MQTT credentials and gateway ID")
             sys.exit(1)
         except Exception as e:
             logger.error(f"Failed to load configuration: {e}")
@@ -317,13 +312,15 @@ def main():
                 hop_limit=config.config.meshtastic.hop_limit
             )
             
-            # Log hex dump in verbose mode
-            if args.verbose:
+            # Log hex dump only when DEBUG output will actually be emitted
+            if logger.isEnabledFor(logging.DEBUG):
                 hex_dump = protobuf_payload.hex()
-                logger.debug(f"Protobuf message hex dump ({len(protobuf_payload)} bytes):")
-                # Format hex dump in readable chunks
-                for i in range(0, len(hex_dump), 64):
-                    logger.debug(f"  {hex_dump[i:i+64]}")
+                # Format hex dump in readable chunks, as a single log record
+                logger.debug(
+                    "Protobuf message hex dump (%d bytes):\n%s",
+                    len(protobuf_payload),
+                    "\n".join(f"  {hex_dump[i:i+64]}" for i in range(0, len(hex_dump), 64))
+                )
             
         except ValueError as e:
             logger.error(f"Failed to build protobuf message: {e}")
@@ -343,7 +340,7 @@ def main():
         # Connect to MQTT broker
         try:
             logger.debug("Connecting to MQTT broker")
-            client = MeshtasticMQTTClient(
+            client = MeshtasticMQTTClient.get_or_create(
                 server=config.config.mqtt.server,
                 port=config.config.mqtt.port,
                 username=config.config.mqtt.username,
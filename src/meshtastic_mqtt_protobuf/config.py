@@ -41,8 +41,8 @@ Security Considerations:
 """
 
 import os
-import yaml
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
 from typing import Optional, Any
 from pathlib import Path
 
@@ -67,6 +67,17 @@ class MeshtasticConfig:
     hop_limit: int = 3
 
 
+# Field names accepted in each YAML section; defaults live on the dataclasses
+_MQTT_FIELDS = frozenset(f.name for f in fields(MQTTConfig))
+_MESHTASTIC_FIELDS = frozenset(f.name for f in fields(MeshtasticConfig))
+
+# Dotted key -> getter on a Config instance, used by Config.get()
+_GETTERS = {
+    **{f'mqtt.{name}': attrgetter(f'config.mqtt.{name}') for name in _MQTT_FIELDS},
+    **{f'meshtastic.{name}': attrgetter(f'config.meshtastic.{name}') for name in _MESHTASTIC_FIELDS},
+}
+
+
 @dataclass
 class AppConfig:
     """Combined application configuration."""
@@ -91,12 +102,17 @@ class Config:
             FileNotFoundError: If config file doesn't exist
             yaml.YAMLError: If YAML syntax is invalid
         """
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Configuration file not found: {path}")
+        # Imported lazily so --help/--version don't pay for PyYAML
+        import yaml
+        try:
+            from yaml import CSafeLoader as SafeLoader
+        except ImportError:  # PyYAML built without LibYAML
+            from yaml import SafeLoader
         
+        # open() raises FileNotFoundError itself; no separate exists() check
         try:
             with open(path, 'r') as f:
-                data = yaml.safe_load(f)
+                data = yaml.load(f, Loader=SafeLoader)
             
             if data is None:
                 data = {}
@@ -105,22 +121,14 @@ class Config:
             if 'mqtt' in data:
                 mqtt_data = data['mqtt']
                 self.config.mqtt = MQTTConfig(
-                    server=mqtt_data.get('server', ''),
-                    port=mqtt_data.get('port', 1883),
-                    username=mqtt_data.get('username', ''),
-                    password=mqtt_data.get('password', '')
+                    **{k: v for k, v in mqtt_data.items() if k in _MQTT_FIELDS}
                 )
             
             # Load Meshtastic config
             if 'meshtastic' in data:
                 mesh_data = data['meshtastic']
                 self.config.meshtastic = MeshtasticConfig(
-                    gateway_id=mesh_data.get('gateway_id', ''),
-                    to_id=mesh_data.get('to_id', '^all'),
-                    channel=mesh_data.get('channel', 'LongFast'),
-                    region=mesh_data.get('region', 'US'),
-                    want_ack=mesh_data.get('want_ack', False),
-                    hop_limit=mesh_data.get('hop_limit', 3)
+                    **{k: v for k, v in mesh_data.items() if k in _MESHTASTIC_FIELDS}
                 )
         
         except yaml.YAMLError as e:
@@ -203,19 +211,8 @@ class Config:
         Returns:
             Configuration value or default
         """
-        parts = key.split('.')
-        
-        if len(parts) != 2:
-            return default
-        
-        section, field = parts
-        
-        if section == 'mqtt':
-            return getattr(self.config.mqtt, field, default)
-        elif section == 'meshtastic':
-            return getattr(self.config.meshtastic, field, default)
-        
-        return default
+        getter = _GETTERS.get(key)
+        return getter(self) if getter is not None else default
     
     @staticmethod
     def create_default_config(path: str) -> None:
@@ -224,6 +221,12 @@ class Config:
         Args:
             path: Path where config file should be created
         """
+        import yaml
+        try:
+            from yaml import CSafeDumper as SafeDumper
+        except ImportError:  # PyYAML built without LibYAML
+            from yaml import SafeDumper
+        
         # Create directory if it doesn't exist
         config_dir = os.path.dirname(path)
         if config_dir:
@@ -249,7 +252,7 @@ class Config:
         
         # Write YAML file
         with open(path, 'w') as f:
-            yaml.dump(default_config, f, default_flow_style=False, sort_keys=False)
+            yaml.dump(default_config, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
         
         # Set restrictive permissions on Unix-like systems
         if os.name != 'nt':  # Not Windows
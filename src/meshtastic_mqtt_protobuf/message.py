@@ -16,8 +16,9 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 This module handles the construction of Meshtastic protocol buffer messages
-for transmission over MQTT. It uses the official Meshtastic protobuf definitions
-from the meshtastic Python package to ensure protocol compatibility.
+for transmission over MQTT. Messages are encoded directly in protobuf wire
+format following the official Meshtastic protobuf definitions; the test suite
+checks the output byte-for-byte against the meshtastic Python package.
 
 Protocol Overview:
 -----------------
@@ -43,18 +44,55 @@ References:
 - Meshtastic Protobufs: https://buf.build/meshtastic/protobufs
 """
 
-import time
-import random
+import functools
+import itertools
+import secrets
 
-from meshtastic import mesh_pb2, mqtt_pb2, portnums_pb2
 
 
+# Application port for plain text (portnums_pb2.PortNum.TEXT_MESSAGE_APP)
+_TEXT_MESSAGE_APP = 1
+
+# Accepted spellings of the broadcast address
+_BROADCAST_IDS = frozenset(("^all", "^ALL"))
+
+# Characters allowed after "!"; int(x, 16) alone would also accept a
+# "0x" prefix, sign, underscores and surrounding whitespace
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+# Largest value of the uint32/fixed32 fields in MeshPacket
+_UINT32_MAX = 0xFFFFFFFF
+
+# Packet ID sequence, started at a random point so separate runs and
+# processes are unlikely to reuse each other's IDs
+_PACKET_IDS = itertools.count(secrets.randbits(32) & 0x7FFFFFFF)
+
+# Wire tags, (field_number << 3) | wire_type, of the fields written by
+# _serialize_text_envelope. Field numbers follow mesh.proto and mqtt.proto.
+_TAG_DATA_PORTNUM = 0x08           # Data.portnum = 1, varint
+_TAG_DATA_PAYLOAD = 0x12           # Data.payload = 2, length-delimited
+_TAG_PACKET_FROM = 0x0D            # MeshPacket.from = 1, fixed32
+_TAG_PACKET_TO = 0x15              # MeshPacket.to = 2, fixed32
+_TAG_PACKET_CHANNEL = 0x18         # MeshPacket.channel = 3, varint
+_TAG_PACKET_DECODED = 0x22         # MeshPacket.decoded = 4, length-delimited
+_TAG_PACKET_ID = 0x35              # MeshPacket.id = 6, fixed32
+_TAG_PACKET_HOP_LIMIT = 0x48       # MeshPacket.hop_limit = 9, varint
+_TAG_PACKET_WANT_ACK = 0x50        # MeshPacket.want_ack = 10, varint
+_TAG_ENVELOPE_PACKET = 0x0A        # ServiceEnvelope.packet = 1, length-delimited
+_TAG_ENVELOPE_CHANNEL_ID = 0x12    # ServiceEnvelope.channel_id = 2, length-delimited
+_TAG_ENVELOPE_GATEWAY_ID = 0x1A    # ServiceEnvelope.gateway_id = 3, length-delimited
+
+
+@functools.lru_cache(maxsize=1024)
 def parse_node_id(node_id):
     """Parse a node ID string to integer format.
     
     Converts Meshtastic node ID formats to integer:
     - "!12345678" hex format -> integer
-    - "^all" broadcast -> 0xFFFFFFFF (4294967295)
+    - "^all" (or "^ALL") broadcast -> 0xFFFFFFFF (4294967295)
+    
+    Results are memoized, since the same gateway and recipient IDs are
+    parsed for every message sent.
     
     Args:
         node_id: Node ID string (e.g., "!12345678" or "^all")
@@ -68,44 +106,279 @@ def parse_node_id(node_id):
     if not node_id:
         raise ValueError("Node ID cannot be empty")
     
+    # Dispatch on the prefix character; "!<hex>" is by far the common case
+    prefix = node_id[0]
+    
+    if prefix == "!":
+        hex_part = node_id[1:]
+        if not hex_part:
+            raise ValueError("Node ID hex string cannot be empty after '!'")
+        if not _HEX_DIGITS.issuperset(hex_part):
+            raise ValueError(f"Invalid hex format in node ID: {node_id}")
+        value = int(hex_part, 16)
+    
     # Handle broadcast address
-    if node_id.lower() == "^all":
+    elif node_id in _BROADCAST_IDS:
         return 0xFFFFFFFF  # 4294967295
     
-    # Handle hex format with ! prefix
-    if node_id.startswith("!"):
-        hex_str = node_id[1:]
-        if not hex_str:
-            raise ValueError("Node ID hex string cannot be empty after '!'")
+    # Try parsing as plain integer
+    else:
         try:
-            return int(hex_str, 16)
+            value = int(node_id)
         except ValueError:
-            raise ValueError(f"Invalid hex format in node ID: {node_id}")
+            raise ValueError(f"Invalid node ID format: {node_id}. Expected '!<hex>', '^all', or integer")
     
-    # Try parsing as plain integer
-    try:
-        return int(node_id)
-    except ValueError:
-        raise ValueError(f"Invalid node ID format: {node_id}. Expected '!<hex>', '^all', or integer")
+    if not 0 <= value <= _UINT32_MAX:
+        raise ValueError(f"Node ID out of 32-bit range: {node_id}")
+    return value
 
 
 def generate_packet_id():
     """Generate a unique packet identifier.
     
-    Uses a combination of timestamp and random value to ensure uniqueness.
+    IDs come from a process-wide counter with a random starting point, so
+    consecutive packets never collide and no clock read or random draw is
+    needed per message.
     
     Returns:
-        Integer packet ID
+        Integer packet ID (non-zero, within 32-bit range)
+    """
+    # Wrap to 32 bits; 0 means "no ID" in Meshtastic, so skip it
+    return next(_PACKET_IDS) & _UINT32_MAX or 1
+
+
+def _varint(value, out):
+    """Append an unsigned integer to out as a protobuf base-128 varint."""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _varint_size(value):
+    """Return the number of bytes _varint() writes for value."""
+    return (value.bit_length() + 6) // 7 or 1
+
+
+def _from_field(from_node):
+    """Encode MeshPacket.from as a complete field (empty when 0)."""
+    if not from_node:
+        return b""
+    return bytes((_TAG_PACKET_FROM,)) + from_node.to_bytes(4, 'little')
+
+
+def _envelope_tail(channel_name_bytes, gateway_id_bytes):
+    """Encode the ServiceEnvelope channel_id and gateway_id fields."""
+    tail = bytearray()
+    if channel_name_bytes:
+        tail.append(_TAG_ENVELOPE_CHANNEL_ID)
+        _varint(len(channel_name_bytes), tail)
+        tail += channel_name_bytes
+    if gateway_id_bytes:
+        tail.append(_TAG_ENVELOPE_GATEWAY_ID)
+        _varint(len(gateway_id_bytes), tail)
+        tail += gateway_id_bytes
+    return bytes(tail)
+
+
+def _serialize_text_envelope(text_bytes, from_node, to_node, pid, channel_idx,
+                             hop_limit, want_ack, channel_name_bytes, gateway_id_bytes,
+                             out=None):
+    """Encode a text message ServiceEnvelope in protobuf wire format.
+    
+    Produces the same bytes as populating mqtt_pb2.ServiceEnvelope and
+    calling SerializeToString(): fields are written in field-number order
+    and proto3 default values (0, False, empty) are omitted. Skipping the
+    generic protobuf machinery matters because every message sent by this
+    tool has exactly this shape.
+    
+    Args:
+        text_bytes: UTF-8 encoded message text
+        from_node: Sender node ID (uint32)
+        to_node: Recipient node ID (uint32)
+        pid: Packet ID (uint32)
+        channel_idx: Channel index (uint32)
+        hop_limit: Maximum number of hops (uint32)
+        want_ack: Whether to request acknowledgment
+        channel_name_bytes: UTF-8 encoded channel name
+        gateway_id_bytes: UTF-8 encoded gateway ID
+        out: Optional bytearray to write into; its previous contents are
+            replaced and it is returned instead of a new bytes object
+        
+    Returns:
+        Serialized ServiceEnvelope, as bytes or as out when given
+    """
+    return _encode_text_envelope(
+        text_bytes, _from_field(from_node), to_node, pid, channel_idx,
+        hop_limit, want_ack, _envelope_tail(channel_name_bytes, gateway_id_bytes),
+        out
+    )
+
+
+def _encode_text_envelope(text_bytes, from_field, to_node, pid, channel_idx,
+                          hop_limit, want_ack, envelope_tail, out):
+    """Encode a text message ServiceEnvelope around pre-encoded fixed fields.
+    
+    Same output as _serialize_text_envelope(), but the sender field and the
+    trailing channel_id/gateway_id fields are passed in already encoded (see
+    _from_field() and _envelope_tail()), so a MessageBuilder encodes them
+    once per session and copies them into each message.
+    """
+    text_len = len(text_bytes)
+    
+    # Sizes of the nested Data and MeshPacket bodies are computed up front so
+    # their length prefixes can be written first and the whole envelope goes
+    # into one buffer, without building and copying intermediate buffers.
+    data_size = 1 + _varint_size(_TEXT_MESSAGE_APP)
+    if text_len:
+        data_size += 1 + _varint_size(text_len) + text_len
+    
+    packet_size = len(from_field) + 1 + _varint_size(data_size) + data_size
+    if to_node:
+        packet_size += 5
+    if channel_idx:
+        packet_size += 1 + _varint_size(channel_idx)
+    if pid:
+        packet_size += 5
+    if hop_limit:
+        packet_size += 1 + _varint_size(hop_limit)
+    if want_ack:
+        packet_size += 2
+    
+    if out is None:
+        buf = bytearray()
+    else:
+        buf = out
+        del buf[:]
+    
+    # Outer ServiceEnvelope.packet header
+    buf.append(_TAG_ENVELOPE_PACKET)
+    _varint(packet_size, buf)
+    
+    # MeshPacket routing fields, with the Data message embedded in field order
+    buf += from_field
+    if to_node:
+        buf.append(_TAG_PACKET_TO)
+        buf += to_node.to_bytes(4, 'little')
+    if channel_idx:
+        buf.append(_TAG_PACKET_CHANNEL)
+        _varint(channel_idx, buf)
+    # decoded is a oneof member, so it is written even when empty
+    buf.append(_TAG_PACKET_DECODED)
+    _varint(data_size, buf)
+    
+    # Innermost Data message: portnum + payload
+    buf.append(_TAG_DATA_PORTNUM)
+    _varint(_TEXT_MESSAGE_APP, buf)
+    if text_len:
+        buf.append(_TAG_DATA_PAYLOAD)
+        _varint(text_len, buf)
+        buf += text_bytes
+    
+    if pid:
+        buf.append(_TAG_PACKET_ID)
+        buf += pid.to_bytes(4, 'little')
+    if hop_limit:
+        buf.append(_TAG_PACKET_HOP_LIMIT)
+        _varint(hop_limit, buf)
+    if want_ack:
+        buf.append(_TAG_PACKET_WANT_ACK)
+        buf.append(1)
+    
+    # ServiceEnvelope MQTT routing metadata
+    buf += envelope_tail
+    
+    # Hand back the caller's buffer as-is rather than copying it into bytes
+    return bytes(buf) if out is None else buf
+
+
+class MessageBuilder:
+    """Builds text messages for a fixed gateway and channel.
+    
+    The gateway ID and channel are the same for every message in a session,
+    so the wire-format fields carrying them are encoded once here and copied
+    into every message, leaving only the per-message fields to encode.
+    build_protobuf_message() uses a cached builder per gateway/channel pair.
     """
-    # Use lower 32 bits of timestamp in milliseconds plus random component
-    timestamp_ms = int(time.time() * 1000)
-    random_component = random.randint(0, 0xFFFF)
-    # Combine timestamp and random for uniqueness, keep within 32-bit range
-    packet_id = ((timestamp_ms & 0xFFFF) << 16) | random_component
-    return packet_id & 0xFFFFFFFF
+    
+    def __init__(self, gateway_id, channel):
+        """Initialize builder with the session's gateway and channel.
+        
+        Args:
+            gateway_id: Gateway node ID (e.g., "!12345678")
+            channel: Channel name (e.g., "LongFast")
+            
+        Raises:
+            ValueError: If gateway_id is invalid
+        """
+        self.gateway_id = gateway_id
+        self.channel = channel
+        # Gateway is the sender (from) of every packet
+        self._from_field = _from_field(parse_node_id(gateway_id))
+        # Channel name and gateway ID strings for topic routing
+        self._envelope_tail = _envelope_tail(
+            channel.encode('utf-8'), gateway_id.encode('utf-8')
+        )
+    
+    def build(self, text, to_id, want_ack=False, hop_limit=3, out=None):
+        """Build a serialized ServiceEnvelope for one text message.
+        
+        Args:
+            text: Message text to send, as str or as already UTF-8 encoded
+                bytes (lets retry loops encode the text only once)
+            to_id: Recipient node ID (e.g., "!12345678" or "^all")
+            want_ack: Whether to request acknowledgment (default: False)
+            hop_limit: Maximum number of hops (default: 3)
+            out: Optional bytearray to serialize into, reused across sends
+                instead of allocating a new bytes object per message
+            
+        Returns:
+            Serialized protobuf message bytes, or out when given
+            
+        Raises:
+            ValueError: If parameters are invalid
+        """
+        if isinstance(text, str):
+            payload = text.encode('utf-8')
+        elif isinstance(text, (bytes, bytearray)):
+            payload = text
+        else:
+            raise ValueError("Message text must be str or bytes")
+        
+        if not payload:
+            raise ValueError("Message text cannot be empty")
+        
+        # Recipient is the destination (to)
+        to_node = parse_node_id(to_id)
+        
+        if not 0 <= hop_limit <= _UINT32_MAX:
+            raise ValueError(f"Invalid hop_limit: {hop_limit}")
+        
+        # Encode straight to wire format; see _serialize_text_envelope
+        return _encode_text_envelope(
+            payload,  # UTF-8 encoded message text
+            self._from_field,
+            to_node,
+            generate_packet_id(),  # Unique ID for tracking and deduplication
+            0,  # Channel index (0 = default/primary channel)
+            hop_limit,  # Max hops before packet expires
+            want_ack,  # Request acknowledgment from recipient
+            self._envelope_tail,
+            out
+        )
 
 
-def build_protobuf_message(text, to_id, gateway_id, channel, want_ack=False, hop_limit=3):
+@functools.lru_cache(maxsize=32)
+def _get_builder(gateway_id, channel):
+    """Return a shared MessageBuilder for a gateway/channel pair.
+    
+    Builders hold no per-message state, so one instance can safely be
+    shared across calls and threads.
+    """
+    return MessageBuilder(gateway_id, channel)
+
+
+def build_protobuf_message(text, to_id, gateway_id, channel, want_ack=False, hop_limit=3, out=None):
     """Build a Meshtastic protobuf message.
     
     Constructs a ServiceEnvelope containing a MeshPacket with Data payload
@@ -131,57 +404,57 @@ def build_protobuf_message(text, to_id, gateway_id, channel, want_ack=False, hop
     compatibility with all Meshtastic devices and firmware versions.
     
     Args:
-        text: Message text to send
+        text: Message text to send, as str or UTF-8 encoded bytes
         to_id: Recipient node ID (e.g., "!12345678" or "^all")
         gateway_id: Gateway node ID (e.g., "!12345678")
         channel: Channel name (e.g., "LongFast")
         want_ack: Whether to request acknowledgment (default: False)
         hop_limit: Maximum number of hops (default: 3)
+        out: Optional bytearray to serialize into instead of returning
+            a new bytes object
         
     Returns:
-        Serialized protobuf message bytes
+        Serialized protobuf message bytes, or out when given
         
     Raises:
         ValueError: If parameters are invalid
     """
-    if not text:
-        raise ValueError("Message text cannot be empty")
-    
-    # Parse node IDs from string format to integer format
-    # Gateway is the sender (from), recipient is the destination (to)
-    from_node = parse_node_id(gateway_id)
-    to_node = parse_node_id(to_id)
-    
-    # Step 1: Create the Data payload
-    # This is the innermost layer containing the actual message content
-    data = mesh_pb2.Data()
-    data.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP  # Port 1 = text messages
-    data.payload = text.encode('utf-8')  # Encode text as UTF-8 bytes
-    
-    # Step 2: Create the MeshPacket
-    # This wraps the Data payload with routing and delivery information
-    packet = mesh_pb2.MeshPacket()
-    setattr(packet, 'from', from_node)  # 'from' is a Python keyword, use setattr
-    packet.to = to_node
-    packet.id = generate_packet_id()  # Unique ID for tracking and deduplication
-    packet.channel = 0  # Channel index (0 = default/primary channel)
-    packet.hop_limit = hop_limit  # Max hops before packet expires
-    packet.want_ack = want_ack  # Request acknowledgment from recipient
-    packet.decoded.CopyFrom(data)  # Embed the Data payload
-    
-    # Step 3: Create the ServiceEnvelope
-    # This is the outer wrapper used for MQTT transport
-    # It contains the packet plus metadata for MQTT routing
-    envelope = mqtt_pb2.ServiceEnvelope()
-    envelope.packet.CopyFrom(packet)  # Embed the MeshPacket
-    envelope.channel_id = channel  # Channel name string for topic routing
-    envelope.gateway_id = gateway_id  # Gateway ID string for topic routing
-    
-    # Step 4: Serialize to binary format
-    # The protobuf is converted to binary bytes for MQTT transmission
-    return envelope.SerializeToString()
+    return _get_builder(gateway_id, channel).build(
+        text, to_id, want_ack=want_ack, hop_limit=hop_limit, out=out
+    )
 
 
+def build_protobuf_batch(texts, to_id, gateway_id, channel, want_ack=False, hop_limit=3):
+    """Build one serialized ServiceEnvelope per text for a bulk send.
+    
+    Each text becomes its own complete envelope with its own packet ID.
+    Meshtastic gateways expect exactly one ServiceEnvelope per MQTT
+    message, so the envelopes are returned separately rather than
+    concatenated; pass them to MeshtasticMQTTClient.publish_many() to
+    send them with a single wait for the broker's acknowledgments.
+    
+    Args:
+        texts: Iterable of message texts to send, each str or UTF-8 bytes
+        to_id: Recipient node ID (e.g., "!12345678" or "^all")
+        gateway_id: Gateway node ID (e.g., "!12345678")
+        channel: Channel name (e.g., "LongFast")
+        want_ack: Whether to request acknowledgment (default: False)
+        hop_limit: Maximum number of hops (default: 3)
+        
+    Returns:
+        List of serialized protobuf message bytes, in the order of texts
+        
+    Raises:
+        ValueError: If parameters are invalid
+    """
+    build = _get_builder(gateway_id, channel).build
+    return [
+        build(text, to_id, want_ack=want_ack, hop_limit=hop_limit)
+        for text in texts
+    ]
+
+
+@functools.lru_cache(maxsize=128)
 def build_topic(region, channel, gateway_id):
     """Build MQTT topic string for Meshtastic.
     
@@ -202,6 +475,9 @@ def build_topic(region, channel, gateway_id):
     This topic format ensures messages are routed to the correct gateway
     and channel within the Meshtastic mesh network.
     
+    Results are memoized, so repeat calls for the same topic return the
+    same string object instead of formatting a new one.
+    
     Args:
         region: Region code (e.g., "US", "EU")
         channel: Channel name (e.g., "LongFast")
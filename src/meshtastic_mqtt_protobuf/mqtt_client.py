@@ -21,20 +21,25 @@ management, authentication, and reliable message delivery.
 
 MQTT Protocol Details:
 ---------------------
-- Uses MQTT v3.1.1 protocol via paho-mqtt library
+- Uses MQTT v5 protocol via paho-mqtt library (callback API version 2)
 - QoS 1 (at least once delivery) for reliable message transmission
 - Binary payload format (protobuf serialized bytes)
 - Standard MQTT authentication with username/password
+- Persistent session (clean_start=False, 1 hour session expiry)
 
 Connection Flow:
 ---------------
 1. Create client instance with broker credentials
 2. Set username/password for authentication
-3. Connect to broker (async with callback)
-4. Wait for connection confirmation
+3. Connect to broker (connect_async on paho's network thread)
+4. Wait for connection confirmation (a future resolved by the callback)
 5. Publish binary protobuf messages
 6. Disconnect cleanly when done
 
+Repeated senders can share one connection through
+MeshtasticMQTTClient.get_or_create(), which keeps pooled clients connected
+between sends and closes them at interpreter exit.
+
 Error Handling:
 --------------
 The client provides detailed error messages for common failure scenarios:
@@ -43,16 +48,98 @@ The client provides detailed error messages for common failure scenarios:
 - Timeout errors (slow network, unresponsive broker)
 """
 
+import atexit
+import concurrent.futures
 import logging
-import paho.mqtt.client as mqtt
+import secrets
+import socket
+import threading
+
+from .message import build_topic
 
 
 logger = logging.getLogger(__name__)
 
+# paho.mqtt.client, imported by _import_paho() on the first connect()
+mqtt = None
+
+# MQTT v5 CONNACK reason codes -> error messages
+_CONNECT_ERROR_MESSAGES = {
+    132: "Connection refused - incorrect protocol version",
+    133: "Connection refused - invalid client identifier",
+    134: "Connection refused - bad username or password",
+    135: "Connection refused - not authorized",
+    136: "Connection refused - server unavailable",
+    137: "Connection refused - server busy",
+    138: "Connection refused - client banned"
+}
+
+# Seconds the broker keeps our session after the connection drops
+_SESSION_EXPIRY_INTERVAL = 3600
+
+# Socket send/receive buffer size, sized for batched publishes
+_SOCKET_BUFFER_SIZE = 64 * 1024
+
+# Optional zstd compression for publish(compress=True). Compressed messages
+# carry a marker byte and go to the topic plus this suffix, so standard
+# Meshtastic subscribers never see them.
+_ZSTD_MARKER = b"\x1f"
+_ZSTD_TOPIC_SUFFIX = "/zstd"
+_ZSTD_LEVEL = 1
+# Smaller payloads (any single text message) are sent uncompressed
+_COMPRESS_MIN_SIZE = 256
+
+# paho publish() result codes -> error messages, filled in by _import_paho()
+_PUBLISH_ERROR_MESSAGES = {}
+
+# Shared clients from get_or_create(), keyed by broker and credentials
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _import_paho():
+    """Import paho-mqtt on first use and return paho.mqtt.client.
+    
+    paho is only needed once a connection is made, so CLI runs that fail
+    earlier (missing config, empty message, invalid hop limit) never load it.
+    """
+    global mqtt
+    if mqtt is None:
+        import paho.mqtt.client as paho_client
+        _PUBLISH_ERROR_MESSAGES.update({
+            paho_client.MQTT_ERR_NO_CONN: "No connection to broker",
+            paho_client.MQTT_ERR_QUEUE_SIZE: "Message queue is full"
+        })
+        mqtt = paho_client
+    return mqtt
+
+
+def _compress(payload):
+    """Compress a payload with zstd and prefix the compression marker.
+    
+    zstandard is an optional dependency, imported only when compression is
+    requested; install it with the package's "zstd" extra.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Compression requires the zstandard package: "
+            "pip install meshtastic-mqtt-protobuf[zstd]"
+        )
+    return _ZSTD_MARKER + zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(payload)
+
 
 class MeshtasticMQTTClient:
     """MQTT client for publishing protobuf messages to Meshtastic brokers."""
     
+    # Fixed attribute set; no per-instance __dict__ for pooled clients
+    __slots__ = (
+        'server', 'port', 'username', 'password', 'client_id', 'client',
+        'connected', 'connection_error', 'topic', '_connect_future',
+        '_pooled', '_refcount'
+    )
+    
     def __init__(self, server, port, username, password):
         """Initialize MQTT client with connection parameters.
         
@@ -66,39 +153,147 @@ class MeshtasticMQTTClient:
         self.port = port
         self.username = username
         self.password = password
+        # Stable per instance, so a reconnect resumes the same broker session
+        self.client_id = f"meshtastic-pb-{secrets.token_hex(6)}"
         self.client = None
         self.connected = False
         self.connection_error = None
+        # Default topic for publish(), set by bind_topic()
+        self.topic = None
+        # Resolved by _on_connect / _on_connect_fail for each connect() call
+        self._connect_future = None
+        # Pooled clients stay connected across disconnect() calls
+        self._pooled = False
+        self._refcount = 0
+    
+    @classmethod
+    def get_or_create(cls, server, port, username, password):
+        """Return a shared client for a broker, creating it on first use.
+        
+        Repeated sends to the same broker reuse one client, so the TCP and
+        MQTT handshake is paid once rather than per message. disconnect() on
+        a pooled client only releases the caller's reference; the connection
+        stays open until shutdown_all(), which runs at interpreter exit.
+        
+        Args:
+            server: MQTT broker address
+            port: MQTT broker port
+            username: MQTT username
+            password: MQTT password
+            
+        Returns:
+            Pooled MeshtasticMQTTClient; call connect() before publishing,
+            which returns immediately if it is already connected
+        """
+        key = (server, port, username, password)
+        with _POOL_LOCK:
+            client = _POOL.get(key)
+            if client is None:
+                client = cls(server, port, username, password)
+                client._pooled = True
+                _POOL[key] = client
+            client._refcount += 1
+        return client
+    
+    @staticmethod
+    def shutdown_all():
+        """Disconnect and forget every pooled client."""
+        with _POOL_LOCK:
+            clients = list(_POOL.values())
+            _POOL.clear()
+        for client in clients:
+            client._refcount = 0
+            client._close()
     
-    def _on_connect(self, client, userdata, flags, rc):
+    def bind_topic(self, region, channel, gateway_id):
+        """Set the default topic used when publishing with topic=None.
+        
+        Region, channel and gateway are fixed for a session, so the topic
+        string is built once here rather than for every message.
+        
+        Args:
+            region: Region code (e.g., "US", "EU")
+            channel: Channel name (e.g., "LongFast")
+            gateway_id: Gateway node ID (e.g., "!12345678")
+            
+        Returns:
+            The bound MQTT topic string
+        """
+        self.topic = build_topic(region, channel, gateway_id)
+        return self.topic
+    
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
         """Callback for when the client connects to the broker.
         
         Args:
             client: MQTT client instance
             userdata: User data
             flags: Connection flags
-            rc: Connection result code
+            reason_code: CONNACK reason code (paho ReasonCode)
+            properties: MQTT v5 CONNACK properties
         """
-        if rc == 0:
+        if not reason_code.is_failure:
             self.connected = True
             self.connection_error = None
+            self._set_socket_buffers()
             logger.info(f"Connected to MQTT broker at {self.server}:{self.port}")
         else:
             self.connected = False
-            # Map result codes to error messages
-            error_messages = {
-                1: "Connection refused - incorrect protocol version",
-                2: "Connection refused - invalid client identifier",
-                3: "Connection refused - server unavailable",
-                4: "Connection refused - bad username or password",
-                5: "Connection refused - not authorized"
-            }
-            self.connection_error = error_messages.get(rc, f"Connection refused - unknown error (code {rc})")
+            self.connection_error = _CONNECT_ERROR_MESSAGES.get(
+                reason_code.value,
+                f"Connection refused - {reason_code} (code {reason_code.value})"
+            )
             logger.error(f"Failed to connect to MQTT broker: {self.connection_error}")
+        
+        # Hand the broker's answer to connect(); paho also calls this on
+        # automatic reconnects, after the future has been resolved
+        future = self._connect_future
+        if future is not None and not future.done():
+            if self.connected:
+                future.set_result(reason_code)
+            else:
+                future.set_exception(ConnectionError(
+                    f"Failed to connect to MQTT broker at {self.server}:{self.port}: {self.connection_error}"
+                ))
+    
+    def _set_socket_buffers(self):
+        """Enlarge the connection's socket buffers for batched publishes.
+        
+        Operating system defaults can be smaller than a batch of queued
+        messages, which splits sending them into more system calls.
+        """
+        sock = self.client.socket() if self.client is not None else None
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _SOCKET_BUFFER_SIZE)
+        except OSError as e:
+            logger.debug(f"Could not set socket buffer sizes: {e}")
+    
+    def _on_connect_fail(self, client, userdata):
+        """Callback for when the broker cannot be reached at all.
+        
+        Args:
+            client: MQTT client instance
+            userdata: User data
+        """
+        self.connected = False
+        self.connection_error = "Connection failed - broker unreachable"
+        logger.error(f"Failed to connect to MQTT broker: {self.connection_error}")
+        
+        future = self._connect_future
+        if future is not None and not future.done():
+            future.set_exception(ConnectionError(
+                f"Failed to connect to MQTT broker at {self.server}:{self.port}: {self.connection_error}"
+            ))
     
     def connect(self, timeout=10):
         """Establish connection to MQTT broker.
         
+        Returns immediately if the client is already connected, which is
+        the common case for pooled clients from get_or_create().
+        
         Args:
             timeout: Connection timeout in seconds (default: 10)
             
@@ -106,9 +301,23 @@ class MeshtasticMQTTClient:
             ConnectionError: If connection fails
             TimeoutError: If connection times out
         """
+        if self.connected and self.client is not None:
+            return
+        
+        # Drop what is left of an earlier failed attempt before retrying
+        if self.client is not None:
+            self._close()
+        
+        self._connect_future = concurrent.futures.Future()
+        mqtt = _import_paho()
+        
         try:
             # Create MQTT client instance
-            self.client = mqtt.Client()
+            self.client = mqtt.Client(
+                callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+                client_id=self.client_id,
+                protocol=mqtt.MQTTv5
+            )
             
             # Set username and password
             if self.username and self.password:
@@ -116,46 +325,53 @@ class MeshtasticMQTTClient:
             
             # Set callbacks
             self.client.on_connect = self._on_connect
+            self.client.on_connect_fail = self._on_connect_fail
+            
+            # Connect to broker from the network loop thread, so the TCP
+            # handshake does not block this thread or other clients
+            # Keep the session on the broker between connections, so paho's
+            # automatic reconnects resume it instead of starting a new one
+            properties = mqtt.Properties(mqtt.PacketTypes.CONNECT)
+            properties.SessionExpiryInterval = _SESSION_EXPIRY_INTERVAL
             
-            # Connect to broker
             logger.debug(f"Connecting to MQTT broker at {self.server}:{self.port}")
-            self.client.connect(self.server, self.port, keepalive=60)
+            self.client.connect_async(
+                self.server, self.port, keepalive=60,
+                clean_start=False, properties=properties
+            )
             
             # Start network loop in background
             self.client.loop_start()
             
-            # Wait for connection with timeout
-            import time
-            elapsed = 0
-            while not self.connected and self.connection_error is None and elapsed < timeout:
-                time.sleep(0.1)
-                elapsed += 0.1
-            
-            # Check connection status
-            if self.connected:
-                return
-            elif self.connection_error:
-                raise ConnectionError(f"Failed to connect to MQTT broker at {self.server}:{self.port}: {self.connection_error}")
-            else:
-                raise TimeoutError(f"Connection to MQTT broker at {self.server}:{self.port} timed out after {timeout} seconds")
+            # Wait for the connect callbacks, up to the timeout
+            try:
+                self._connect_future.result(timeout=timeout)
+            except BaseException:
+                # Stop paho retrying in the background after a failed connect
+                self.client.loop_stop()
+                raise
         
-        except TimeoutError:
-            # Re-raise TimeoutError without wrapping
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError(f"Connection to MQTT broker at {self.server}:{self.port} timed out after {timeout} seconds")
+        except ConnectionError:
+            # Already carries the broker's reason from the callbacks
             raise
-        except (OSError, ConnectionRefusedError) as e:
+        except OSError as e:
             raise ConnectionError(f"Failed to connect to MQTT broker at {self.server}:{self.port}: {e}")
     
-    def _on_publish(self, client, userdata, mid):
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
         """Callback for when a message is published.
         
         Args:
             client: MQTT client instance
             userdata: User data
             mid: Message ID
+            reason_code: PUBACK reason code (paho ReasonCode)
+            properties: MQTT v5 PUBACK properties
         """
         logger.debug(f"Message published successfully (mid: {mid})")
     
-    def publish(self, topic, payload):
+    def publish(self, topic, payload, compress=False):
         """Publish binary protobuf message to MQTT topic.
         
         Publishes a binary protobuf message using QoS 1 (at least once delivery)
@@ -176,19 +392,83 @@ class MeshtasticMQTTClient:
         transformation is needed. This is more efficient than JSON text format.
         
         Args:
-            topic: MQTT topic string (e.g., "msh/US/2/e/LongFast/!12345678")
-            payload: Binary protobuf message bytes (ServiceEnvelope serialized)
+            topic: MQTT topic string (e.g., "msh/US/2/e/LongFast/!12345678"),
+                or None to use the topic set by bind_topic()
+            payload: Binary protobuf message bytes (ServiceEnvelope serialized),
+                as bytes or bytearray
+            compress: Compress payloads over 256 bytes with zstd (default:
+                False); see publish_async()
             
         Raises:
             RuntimeError: If not connected to broker
-            ValueError: If payload is not bytes
+            ValueError: If payload is not bytes or bytearray, or no topic is
+                given and none is bound
+            ImportError: If compress is set and zstandard is not installed
+            Exception: If publish fails
+        """
+        if topic is None:
+            topic = self.topic
+        
+        result = self.publish_async(topic, payload, compress=compress)
+        
+        try:
+            # Wait for message to be sent and acknowledged by broker
+            result.wait_for_publish()
+            
+            logger.info(f"Message published successfully to {topic}")
+            
+        except Exception as e:
+            logger.error(f"Error publishing message: {e}")
+            raise
+    
+    def publish_async(self, topic, payload, compress=False):
+        """Queue a binary protobuf message without waiting for the broker.
+        
+        Same as publish(), but returns as soon as the message has been handed
+        to paho instead of blocking until the broker's QoS 1 acknowledgment
+        arrives. Callers sending several messages can queue them all and then
+        wait on the returned handles, so the acknowledgments overlap instead
+        of costing one round trip each.
+        
+        Args:
+            topic: MQTT topic string (e.g., "msh/US/2/e/LongFast/!12345678"),
+                or None to use the topic set by bind_topic()
+            payload: Binary protobuf message (bytes or bytearray). paho keeps
+                a reference for QoS 1 retransmission, so a bytearray must not
+                be modified until the message has been acknowledged.
+            compress: Compress payloads over 256 bytes with zstd (default:
+                False). A compressed payload is prefixed with the 0x1F
+                marker byte and published to the topic plus "/zstd", since
+                Meshtastic gateways only understand uncompressed envelopes;
+                subscribers strip the marker and decompress.
+            
+        Returns:
+            paho MQTTMessageInfo for the message; call wait_for_publish() on
+            it to block until the broker has acknowledged it
+            
+        Raises:
+            RuntimeError: If not connected to broker
+            ValueError: If payload is not bytes or bytearray, or no topic is
+                given and none is bound
+            ImportError: If compress is set and zstandard is not installed
             Exception: If publish fails
         """
         if not self.connected or self.client is None:
             raise RuntimeError("Not connected to MQTT broker. Call connect() first.")
         
-        if not isinstance(payload, bytes):
-            raise ValueError("Payload must be bytes")
+        # paho passes bytes and bytearray through untouched (it rejects
+        # memoryview), so a caller-owned bytearray is published without a copy
+        if not isinstance(payload, (bytes, bytearray)):
+            raise ValueError("Payload must be bytes or bytearray")
+        
+        if topic is None:
+            topic = self.topic
+            if topic is None:
+                raise ValueError("No topic given and none bound with bind_topic()")
+        
+        if compress and len(payload) > _COMPRESS_MIN_SIZE:
+            payload = _compress(payload)
+            topic += _ZSTD_TOPIC_SUFFIX
         
         try:
             # Set publish callback
@@ -203,24 +483,73 @@ class MeshtasticMQTTClient:
             
             # Check if publish was successful
             if result.rc != mqtt.MQTT_ERR_SUCCESS:
-                error_messages = {
-                    mqtt.MQTT_ERR_NO_CONN: "No connection to broker",
-                    mqtt.MQTT_ERR_QUEUE_SIZE: "Message queue is full"
-                }
-                error_msg = error_messages.get(result.rc, f"Publish failed with error code {result.rc}")
+                error_msg = _PUBLISH_ERROR_MESSAGES.get(result.rc, f"Publish failed with error code {result.rc}")
                 raise Exception(f"Failed to publish message: {error_msg}")
             
-            # Wait for message to be sent and acknowledged by broker
-            result.wait_for_publish()
+        except Exception as e:
+            logger.error(f"Error publishing message: {e}")
+            raise
+        
+        return result
+    
+    def publish_many(self, topic, payloads, compress=False):
+        """Publish several binary protobuf messages and wait once for all.
+        
+        Every payload is queued with publish_async() before any
+        acknowledgment is awaited, so the QoS 1 round trips overlap and a
+        batch of N messages costs roughly one round trip instead of N.
+        Each payload is still sent as its own MQTT message.
+        
+        Args:
+            topic: MQTT topic string (e.g., "msh/US/2/e/LongFast/!12345678"),
+                or None to use the topic set by bind_topic()
+            payloads: Iterable of binary protobuf messages (bytes or
+                bytearray), e.g. from build_protobuf_batch()
+            compress: Compress payloads over 256 bytes with zstd (default:
+                False); see publish_async()
             
-            logger.info(f"Message published successfully to {topic}")
+        Raises:
+            RuntimeError: If not connected to broker
+            ValueError: If a payload is not bytes or bytearray, or no topic
+                is given and none is bound
+            ImportError: If compress is set and zstandard is not installed
+            Exception: If publish fails
+        """
+        if topic is None:
+            topic = self.topic
+        
+        results = [
+            self.publish_async(topic, payload, compress=compress)
+            for payload in payloads
+        ]
+        
+        try:
+            # Wait for every message to be acknowledged by the broker
+            for result in results:
+                result.wait_for_publish()
+            
+            logger.info(f"{len(results)} messages published successfully to {topic}")
             
         except Exception as e:
             logger.error(f"Error publishing message: {e}")
             raise
     
     def disconnect(self):
-        """Cleanly disconnect from MQTT broker and release resources."""
+        """Cleanly disconnect from MQTT broker and release resources.
+        
+        For a pooled client from get_or_create() this only releases the
+        caller's reference and leaves the connection open for the next
+        sender; shutdown_all() closes it.
+        """
+        if self._pooled:
+            with _POOL_LOCK:
+                self._refcount = max(self._refcount - 1, 0)
+            return
+        
+        self._close()
+    
+    def _close(self):
+        """Stop the network loop and disconnect from the broker."""
         if self.client is not None:
             try:
                 logger.debug("Disconnecting from MQTT broker")
@@ -232,3 +561,6 @@ class MeshtasticMQTTClient:
                 logger.warning(f"Error during disconnect: {e}")
             finally:
                 self.client = None
+
+
+atexit.register(MeshtasticMQTTClient.shutdown_all)
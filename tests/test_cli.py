@@ -139,7 +139,7 @@ class TestMainFunction(unittest.TestCase):
         """Test successful end-to-end flow."""
         # Mock MQTT client
         mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
+        mock_mqtt_client.get_or_create.return_value = mock_client_instance
         
         # Test arguments
         test_args = [
@@ -211,7 +211,7 @@ class TestMainFunction(unittest.TestCase):
     def test_main_cli_overrides(self, mock_mqtt_client):
         """Test CLI arguments override config file."""
         mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
+        mock_mqtt_client.get_or_create.return_value = mock_client_instance
         
         test_args = [
             'meshtastic-send-pb',
@@ -229,7 +229,7 @@ class TestMainFunction(unittest.TestCase):
             self.assertEqual(context.exception.code, 0)
             
             # Verify custom server was used
-            call_args = mock_mqtt_client.call_args
+            call_args = mock_mqtt_client.get_or_create.call_args
             self.assertEqual(call_args[1]['server'], 'custom.mqtt.com')
     
     @patch('src.meshtastic_mqtt_protobuf.cli.MeshtasticMQTTClient')
@@ -237,7 +237,7 @@ class TestMainFunction(unittest.TestCase):
         """Test handling of MQTT connection errors."""
         mock_client_instance = MagicMock()
         mock_client_instance.connect.side_effect = ConnectionError("Connection refused")
-        mock_mqtt_client.return_value = mock_client_instance
+        mock_mqtt_client.get_or_create.return_value = mock_client_instance
         
         test_args = [
             'meshtastic-send-pb',
@@ -12,6 +12,7 @@ Note: These tests require network connectivity to mqtt.meshtastic.org
 import unittest
 import sys
 import os
+import itertools
 from unittest.mock import patch
 import time
 
@@ -24,6 +25,10 @@ from src.meshtastic_mqtt_protobuf.message import (
 from src.meshtastic_mqtt_protobuf.mqtt_client import MeshtasticMQTTClient
 from src.meshtastic_mqtt_protobuf.config import Config
 
+# Parse with the native upb backend unless told otherwise; this must be set
+# before google.protobuf is first imported
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "upb")
+
 # Import protobuf modules to validate message structure
 from meshtastic import mesh_pb2, mqtt_pb2, portnums_pb2
 
@@ -35,6 +40,7 @@ class TestProtobufCompatibility(unittest.TestCase):
         """Verify protobuf message matches Meshtastic specification."""
         # Build a test message
         text = "Test message"
+        text_bytes = text.encode('utf-8')
         to_id = "^all"
         gateway_id = "!12345678"
         channel = "LongFast"
@@ -77,7 +83,7 @@ class TestProtobufCompatibility(unittest.TestCase):
         # Verify Data payload
         data = packet.decoded
         self.assertEqual(data.portnum, portnums_pb2.PortNum.TEXT_MESSAGE_APP)
-        self.assertEqual(data.payload.decode('utf-8'), text)
+        self.assertEqual(data.payload, text_bytes)
     
     def test_protobuf_broadcast_message(self):
         """Verify broadcast message structure."""
@@ -157,6 +163,7 @@ class TestProtobufCompatibility(unittest.TestCase):
     def test_protobuf_unicode_text(self):
         """Verify Unicode text is properly encoded."""
         unicode_text = "Hello 世界! 🌍 Émojis and spëcial çhars"
+        unicode_bytes = unicode_text.encode('utf-8')
         protobuf_bytes = build_protobuf_message(
             text=unicode_text,
             to_id="^all",
@@ -166,8 +173,7 @@ class TestProtobufCompatibility(unittest.TestCase):
         
         envelope = mqtt_pb2.ServiceEnvelope()
         envelope.ParseFromString(protobuf_bytes)
-        decoded_text = envelope.packet.decoded.payload.decode('utf-8')
-        self.assertEqual(decoded_text, unicode_text)
+        self.assertEqual(envelope.packet.decoded.payload, unicode_bytes)
 
 
 class TestMQTTBrokerConnection(unittest.TestCase):
@@ -186,6 +192,35 @@ class TestMQTTBrokerConnection(unittest.TestCase):
         cls.gateway_id = "!12345678"  # Test gateway ID
         cls.region = "US"
         cls.channel = "LongFast"
+        
+        # Message texts are made unique by run timestamp plus a counter
+        cls._base_ts = time.time()
+        cls._counter = itertools.count()
+        
+        # One pooled connection shared by the publish tests, so the broker
+        # handshake is paid once for the class rather than once per test
+        cls.client = MeshtasticMQTTClient.get_or_create(
+            server=cls.server,
+            port=cls.port,
+            username=cls.username,
+            password=cls.password
+        )
+        try:
+            cls.client.connect(timeout=10)
+            cls.connect_error = None
+        except (ConnectionError, TimeoutError) as e:
+            cls.connect_error = e
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Close the shared broker connection."""
+        MeshtasticMQTTClient.shutdown_all()
+    
+    def shared_client(self):
+        """Return the shared connected client, or skip if it did not connect."""
+        if self.connect_error is not None:
+            self.skipTest(f"Could not connect to MQTT broker: {self.connect_error}")
+        return self.client
     
     def test_mqtt_broker_connectivity(self):
         """Test connection to mqtt.meshtastic.org."""
@@ -210,9 +245,11 @@ class TestMQTTBrokerConnection(unittest.TestCase):
     
     def test_publish_broadcast_message(self):
         """Test publishing a broadcast message to actual broker."""
+        client = self.shared_client()
+        
         try:
             # Build message
-            text = f"Test broadcast message at {time.time()}"
+            text = f"Test broadcast message at {self._base_ts}#{next(self._counter)}"
             protobuf_bytes = build_protobuf_message(
                 text=text,
                 to_id="^all",
@@ -225,17 +262,8 @@ class TestMQTTBrokerConnection(unittest.TestCase):
             # Build topic
             topic = build_topic(self.region, self.channel, self.gateway_id)
             
-            # Connect and publish
-            client = MeshtasticMQTTClient(
-                server=self.server,
-                port=self.port,
-                username=self.username,
-                password=self.password
-            )
-            
-            client.connect(timeout=10)
+            # Publish over the shared connection
             client.publish(topic, protobuf_bytes)
-            client.disconnect()
             
             # If we get here, publish was successful
             self.assertTrue(True)
@@ -247,9 +275,11 @@ class TestMQTTBrokerConnection(unittest.TestCase):
     
     def test_publish_direct_message(self):
         """Test publishing a direct message to specific node."""
+        client = self.shared_client()
+        
         try:
             # Build message to specific node
-            text = f"Test direct message at {time.time()}"
+            text = f"Test direct message at {self._base_ts}#{next(self._counter)}"
             target_id = "!87654321"  # Test target node
             
             protobuf_bytes = build_protobuf_message(
@@ -264,17 +294,8 @@ class TestMQTTBrokerConnection(unittest.TestCase):
             # Build topic
             topic = build_topic(self.region, self.channel, self.gateway_id)
             
-            # Connect and publish
-            client = MeshtasticMQTTClient(
-                server=self.server,
-                port=self.port,
-                username=self.username,
-                password=self.password
-            )
-            
-            client.connect(timeout=10)
+            # Publish over the shared connection
             client.publish(topic, protobuf_bytes)
-            client.disconnect()
             
             # If we get here, publish was successful
             self.assertTrue(True)
@@ -286,9 +307,11 @@ class TestMQTTBrokerConnection(unittest.TestCase):
     
     def test_publish_with_acknowledgment(self):
         """Test publishing a message with acknowledgment request."""
+        client = self.shared_client()
+        
         try:
             # Build message with want_ack=True
-            text = f"Test ack message at {time.time()}"
+            text = f"Test ack message at {self._base_ts}#{next(self._counter)}"
             
             protobuf_bytes = build_protobuf_message(
                 text=text,
@@ -302,17 +325,8 @@ class TestMQTTBrokerConnection(unittest.TestCase):
             # Build topic
             topic = build_topic(self.region, self.channel, self.gateway_id)
             
-            # Connect and publish
-            client = MeshtasticMQTTClient(
-                server=self.server,
-                port=self.port,
-                username=self.username,
-                password=self.password
-            )
-            
-            client.connect(timeout=10)
+            # Publish over the shared connection
             client.publish(topic, protobuf_bytes)
-            client.disconnect()
             
             # Verify message structure has want_ack set
             envelope = mqtt_pb2.ServiceEnvelope()
@@ -328,26 +342,38 @@ class TestMQTTBrokerConnection(unittest.TestCase):
 class TestCLIEndToEnd(unittest.TestCase):
     """Test complete CLI workflow with actual broker."""
     
-    def setUp(self):
-        """Set up test configuration."""
+    @classmethod
+    def setUpClass(cls):
+        """Set up test configuration shared by all CLI tests.
+        
+        The tests only read the config file, so it is written once.
+        """
         import tempfile
-        self.temp_dir = tempfile.mkdtemp()
-        self.config_path = os.path.join(self.temp_dir, 'config.yaml')
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.config_path = os.path.join(cls.temp_dir, 'config.yaml')
+        
+        # Message texts are made unique by run timestamp plus a counter
+        cls._base_ts = time.time()
+        cls._counter = itertools.count()
         
         # Create config with actual broker credentials
-        Config.create_default_config(self.config_path)
+        Config.create_default_config(cls.config_path)
     
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up test fixtures."""
         import shutil
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+        if os.path.exists(cls.temp_dir):
+            shutil.rmtree(cls.temp_dir)
+        
+        # The CLI runs share one pooled connection; close it
+        MeshtasticMQTTClient.shutdown_all()
     
     def test_cli_broadcast_message(self):
         """Test sending broadcast message via CLI."""
         test_args = [
             'meshtastic-send-pb',
-            '--message', f'CLI broadcast test at {time.time()}',
+            '--message', f'CLI broadcast test at {self._base_ts}#{next(self._counter)}',
             '--config', self.config_path
         ]
         
@@ -370,7 +396,7 @@ class TestCLIEndToEnd(unittest.TestCase):
         """Test sending direct message via CLI."""
         test_args = [
             'meshtastic-send-pb',
-            '--message', f'CLI direct test at {time.time()}',
+            '--message', f'CLI direct test at {self._base_ts}#{next(self._counter)}',
             '--to-id', '!87654321',
             '--config', self.config_path
         ]
@@ -394,7 +420,7 @@ class TestCLIEndToEnd(unittest.TestCase):
         """Test sending message with acknowledgment request via CLI."""
         test_args = [
             'meshtastic-send-pb',
-            '--message', f'CLI ack test at {time.time()}',
+            '--message', f'CLI ack test at {self._base_ts}#{next(self._counter)}',
             '--want-ack',
             '--config', self.config_path
         ]
@@ -418,7 +444,7 @@ class TestCLIEndToEnd(unittest.TestCase):
         """Test sending message with custom hop limit via CLI."""
         test_args = [
             'meshtastic-send-pb',
-            '--message', f'CLI hop limit test at {time.time()}',
+            '--message', f'CLI hop limit test at {self._base_ts}#{next(self._counter)}',
             '--hop-limit', '5',
             '--config', self.config_path
         ]
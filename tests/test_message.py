@@ -5,7 +5,9 @@ from src.meshtastic_mqtt_protobuf.message import (
     parse_node_id,
     generate_packet_id,
     build_protobuf_message,
-    build_topic
+    build_protobuf_batch,
+    build_topic,
+    MessageBuilder
 )
 
 
@@ -27,6 +29,11 @@ class TestParseNodeId(unittest.TestCase):
         result = parse_node_id("^ALL")
         self.assertEqual(result, 0xFFFFFFFF)
     
+    def test_parse_broadcast_mixed_case_rejected(self):
+        """Test only the lower- and upper-case broadcast spellings are accepted."""
+        with self.assertRaises(ValueError):
+            parse_node_id("^All")
+    
     def test_parse_plain_integer(self):
         """Test parsing plain integer node IDs."""
         result = parse_node_id("12345")
@@ -37,10 +44,23 @@ class TestParseNodeId(unittest.TestCase):
         with self.assertRaises(ValueError):
             parse_node_id("!xyz")
     
+    def test_hex_with_non_digit_characters_rejected(self):
+        """Test that spellings int(x, 16) would accept are rejected."""
+        for node_id in ("!0x12345678", "!-1", "!+1", "!1234_5678", "! 12345678"):
+            with self.subTest(node_id=node_id):
+                with self.assertRaises(ValueError):
+                    parse_node_id(node_id)
+    
     def test_empty_node_id(self):
         """Test error handling for empty node ID."""
         with self.assertRaises(ValueError):
             parse_node_id("")
+    
+    def test_invalid_node_id_raises_on_every_call(self):
+        """Test errors are raised again on repeat calls, not cached."""
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                parse_node_id("!xyz")
 
 
 class TestGeneratePacketId(unittest.TestCase):
@@ -56,6 +76,13 @@ class TestGeneratePacketId(unittest.TestCase):
         """Test that packet ID is an integer."""
         packet_id = generate_packet_id()
         self.assertIsInstance(packet_id, int)
+    
+    def test_ids_in_32_bit_range(self):
+        """Test that packet IDs are non-zero and fit in 32 bits."""
+        for _ in range(100):
+            packet_id = generate_packet_id()
+            self.assertGreater(packet_id, 0)
+            self.assertLessEqual(packet_id, 0xFFFFFFFF)
 
 
 class TestBuildProtobufMessage(unittest.TestCase):
@@ -95,6 +122,79 @@ class TestBuildProtobufMessage(unittest.TestCase):
         self.assertIsInstance(result, bytes)
 
 
+class TestMessageBuilder(unittest.TestCase):
+    """Test reusable message builder."""
+    
+    def test_builds_multiple_messages(self):
+        """Test one builder produces a message per call."""
+        builder = MessageBuilder("!12345678", "LongFast")
+        result1 = builder.build("Hello", "^all")
+        result2 = builder.build("Hello", "!abcdef12", want_ack=True, hop_limit=5)
+        self.assertIsInstance(result1, bytes)
+        self.assertIsInstance(result2, bytes)
+        self.assertNotEqual(result1, result2)
+    
+    def test_build_into_reused_buffer(self):
+        """Test building into a caller-provided bytearray."""
+        builder = MessageBuilder("!12345678", "LongFast")
+        buf = bytearray()
+        
+        result = builder.build("A longer first message", "^all", out=buf)
+        self.assertIs(result, buf)
+        
+        # A shorter message must replace, not append to, the old contents
+        result = builder.build("Hi", "^all", out=buf)
+        self.assertIs(result, buf)
+        self.assertEqual(len(buf), len(builder.build("Hi", "^all")))
+    
+    def test_invalid_gateway_raises_error(self):
+        """Test that an invalid gateway ID is rejected up front."""
+        with self.assertRaises(ValueError):
+            MessageBuilder("!xyz", "LongFast")
+    
+    def test_empty_text_raises_error(self):
+        """Test that empty text raises ValueError."""
+        builder = MessageBuilder("!12345678", "LongFast")
+        with self.assertRaises(ValueError):
+            builder.build("", "^all")
+        with self.assertRaises(ValueError):
+            builder.build(b"", "^all")
+    
+    def test_bytes_text_matches_str_text(self):
+        """Test pre-encoded text gives the same message as str text."""
+        builder = MessageBuilder("!12345678", "LongFast")
+        text = "Hello 世界! 🌍"
+        from_str = builder.build(text, "^all")
+        from_bytes = builder.build(text.encode('utf-8'), "^all")
+        # Only the 4-byte packet ID differs between the two messages
+        self.assertEqual(len(from_str), len(from_bytes))
+        self.assertIn(text.encode('utf-8'), from_bytes)
+    
+    def test_invalid_text_type_raises_error(self):
+        """Test that text other than str or bytes is rejected."""
+        builder = MessageBuilder("!12345678", "LongFast")
+        with self.assertRaises(ValueError):
+            builder.build(123, "^all")
+
+
+class TestBuildProtobufBatch(unittest.TestCase):
+    """Test bulk message construction."""
+    
+    def test_builds_one_message_per_text(self):
+        """Test each text becomes its own serialized envelope."""
+        texts = ["First", "Second", "Third"]
+        result = build_protobuf_batch(texts, "^all", "!12345678", "LongFast")
+        self.assertEqual(len(result), len(texts))
+        for message, text in zip(result, texts):
+            self.assertIsInstance(message, bytes)
+            self.assertIn(text.encode('utf-8'), message)
+    
+    def test_empty_text_in_batch_raises_error(self):
+        """Test that an empty text anywhere in the batch is rejected."""
+        with self.assertRaises(ValueError):
+            build_protobuf_batch(["Hello", ""], "^all", "!12345678", "LongFast")
+
+
 class TestBuildTopic(unittest.TestCase):
     """Test MQTT topic construction."""
     
@@ -1,10 +1,105 @@
 """Unit tests for MQTT client module."""
 
+import functools
+import socket
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.reasoncodes import ReasonCode
 from src.meshtastic_mqtt_protobuf.mqtt_client import MeshtasticMQTTClient
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# CONNACK reason codes passed to on_connect by paho's VERSION2 callback API
+CONNACK_SUCCESS = ReasonCode(PacketTypes.CONNACK, "Success")
+CONNACK_BAD_CREDENTIALS = ReasonCode(PacketTypes.CONNACK, "Bad user name or password")
+
+# Passed as connack to make the fake broker unreachable
+UNREACHABLE = "unreachable"
+
+
+class FakePublishResult:
+    """Stand-in for paho's MQTTMessageInfo."""
+    
+    def __init__(self, rc, events):
+        self.rc = rc
+        self._events = events
+        self.waited = False
+    
+    def wait_for_publish(self):
+        self.waited = True
+        self._events.append("wait")
+
+
+class FakePahoClient:
+    """Stand-in for paho.mqtt.client.Client that records what it is asked to do.
+    
+    connect_async() answers at once, as paho's network thread would once the
+    broker replies: with on_connect(connack), on_connect_fail() when connack
+    is UNREACHABLE, or not at all when connack is None.
+    """
+    
+    def __init__(self, *args, connack=CONNACK_SUCCESS, sock=None, **kwargs):
+        self.connack = connack
+        self.sock = sock
+        self.on_connect = None
+        self.on_connect_fail = None
+        self.on_publish = None
+        self.credentials = None
+        self.client_id = kwargs.get("client_id")
+        self.connect_calls = 0
+        self.connect_kwargs = None
+        self.loop_start_calls = 0
+        self.loop_stop_calls = 0
+        self.disconnect_calls = 0
+        self.published = []
+        self.results = []
+        # Order of publish and wait calls
+        self.events = []
+    
+    def username_pw_set(self, username, password):
+        self.credentials = (username, password)
+    
+    def connect_async(self, host, port, keepalive=60, **kwargs):
+        self.connect_calls += 1
+        self.connect_kwargs = kwargs
+        if self.connack is UNREACHABLE:
+            self.on_connect_fail(self, None)
+        elif self.connack is not None:
+            self.on_connect(self, None, None, self.connack, None)
+    
+    def socket(self):
+        return self.sock
+    
+    def loop_start(self):
+        self.loop_start_calls += 1
+    
+    def loop_stop(self):
+        self.loop_stop_calls += 1
+    
+    def publish(self, topic, payload, qos=0):
+        self.events.append("publish")
+        self.published.append((topic, payload, qos))
+        result = FakePublishResult(mqtt.MQTT_ERR_SUCCESS, self.events)
+        self.results.append(result)
+        return result
+    
+    def disconnect(self):
+        self.disconnect_calls += 1
+
+
+def fake_paho(connack=CONNACK_SUCCESS, sock=None):
+    """Patch paho's Client class with FakePahoClient."""
+    return patch(
+        'paho.mqtt.client.Client',
+        functools.partial(FakePahoClient, connack=connack, sock=sock)
+    )
+
 
 class TestMeshtasticMQTTClient(unittest.TestCase):
     """Test MQTT client functionality."""
@@ -16,6 +111,15 @@ class TestMeshtasticMQTTClient(unittest.TestCase):
         self.username = "testuser"
         self.password = "testpass"
     
+    def connected_client(self):
+        """Return a client connected to a FakePahoClient."""
+        client = MeshtasticMQTTClient(
+            self.server, self.port, self.username, self.password
+        )
+        with fake_paho():
+            client.connect(timeout=1)
+        return client
+    
     def test_init(self):
         """Test client initialization."""
         client = MeshtasticMQTTClient(
@@ -27,98 +131,86 @@ class TestMeshtasticMQTTClient(unittest.TestCase):
         self.assertEqual(client.password, self.password)
         self.assertFalse(client.connected)
         self.assertIsNone(client.client)
+        self.assertFalse(hasattr(client, '__dict__'))
     
-    @patch('paho.mqtt.client.Client')
-    def test_connect_success(self, mock_mqtt_client):
+    def test_connect_success(self):
         """Test successful connection to MQTT broker."""
-        # Create mock client instance
-        mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
+        client = self.connected_client()
         
-        # Create client and connect
+        # Verify connection was attempted
+        self.assertEqual(client.client.credentials, (self.username, self.password))
+        self.assertEqual(client.client.connect_calls, 1)
+        self.assertEqual(client.client.loop_start_calls, 1)
+        self.assertTrue(client.connected)
+    
+    def test_connect_keeps_session(self):
+        """Test the client asks the broker to keep its MQTT v5 session."""
+        client = self.connected_client()
+        
+        self.assertEqual(client.client.client_id, client.client_id)
+        self.assertFalse(client.client.connect_kwargs["clean_start"])
+        properties = client.client.connect_kwargs["properties"]
+        self.assertEqual(properties.SessionExpiryInterval, 3600)
+    
+    def test_connect_sets_socket_buffers(self):
+        """Test the socket buffers are enlarged once connected."""
         client = MeshtasticMQTTClient(
             self.server, self.port, self.username, self.password
         )
         
-        # Simulate successful connection by calling the callback
-        def simulate_connect(*args, **kwargs):
-            # Trigger the on_connect callback with success code
-            if client.client and client.client.on_connect:
-                client.client.on_connect(None, None, None, 0)
-        
-        mock_client_instance.connect.side_effect = simulate_connect
-        
-        client.connect(timeout=1)
-        
-        # Verify connection was attempted
-        mock_client_instance.username_pw_set.assert_called_once_with(
-            self.username, self.password
-        )
-        mock_client_instance.connect.assert_called_once()
-        mock_client_instance.loop_start.assert_called_once()
-        self.assertTrue(client.connected)
+        with socket.socket() as sock:
+            with fake_paho(sock=sock):
+                client.connect(timeout=1)
+            
+            # Linux reports double the requested size for bookkeeping
+            self.assertGreaterEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF), 64 * 1024)
+            self.assertGreaterEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), 64 * 1024)
     
-    @patch('paho.mqtt.client.Client')
-    def test_connect_bad_credentials(self, mock_mqtt_client):
+    def test_connect_bad_credentials(self):
         """Test connection failure with bad credentials."""
-        mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
-        
         client = MeshtasticMQTTClient(
             self.server, self.port, self.username, self.password
         )
         
-        # Simulate connection failure with bad credentials (rc=4)
-        def simulate_connect_fail(*args, **kwargs):
-            if client.client and client.client.on_connect:
-                client.client.on_connect(None, None, None, 4)
-        
-        mock_client_instance.connect.side_effect = simulate_connect_fail
-        
-        with self.assertRaises(ConnectionError) as context:
-            client.connect(timeout=1)
+        # Simulate connection failure with bad credentials (reason code 134)
+        with fake_paho(connack=CONNACK_BAD_CREDENTIALS):
+            with self.assertRaises(ConnectionError) as context:
+                client.connect(timeout=1)
         
         self.assertIn("bad username or password", str(context.exception))
         self.assertFalse(client.connected)
     
-    @patch('paho.mqtt.client.Client')
-    def test_connect_timeout(self, mock_mqtt_client):
-        """Test connection timeout."""
-        mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
-        
+    def test_connect_broker_unreachable(self):
+        """Test connection failure when the broker cannot be reached."""
         client = MeshtasticMQTTClient(
             self.server, self.port, self.username, self.password
         )
         
-        # Don't trigger callback to simulate timeout
-        with self.assertRaises(TimeoutError) as context:
-            client.connect(timeout=0.2)
+        # paho reports socket errors from its network thread via on_connect_fail
+        with fake_paho(connack=UNREACHABLE):
+            with self.assertRaises(ConnectionError) as context:
+                client.connect(timeout=1)
         
-        self.assertIn("timed out", str(context.exception))
+        self.assertIn("unreachable", str(context.exception))
+        self.assertFalse(client.connected)
+        self.assertEqual(client.client.loop_stop_calls, 1)
     
-    @patch('paho.mqtt.client.Client')
-    def test_publish_success(self, mock_mqtt_client):
-        """Test successful message publishing."""
-        mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
-        
-        # Mock publish result
-        mock_result = MagicMock()
-        mock_result.rc = mqtt.MQTT_ERR_SUCCESS
-        mock_client_instance.publish.return_value = mock_result
-        
+    def test_connect_timeout(self):
+        """Test connection timeout."""
         client = MeshtasticMQTTClient(
             self.server, self.port, self.username, self.password
         )
         
-        # Simulate connection
-        def simulate_connect(*args, **kwargs):
-            if client.client and client.client.on_connect:
-                client.client.on_connect(None, None, None, 0)
+        # Don't trigger callback to simulate timeout
+        with fake_paho(connack=None):
+            with self.assertRaises(TimeoutError) as context:
+                client.connect(timeout=0.2)
         
-        mock_client_instance.connect.side_effect = simulate_connect
-        client.connect(timeout=1)
+        self.assertIn("timed out", str(context.exception))
+    
+    def test_publish_success(self):
+        """Test successful message publishing."""
+        client = self.connected_client()
         
         # Publish message
         topic = "msh/US/2/e/LongFast/!12345678"
@@ -127,11 +219,81 @@ class TestMeshtasticMQTTClient(unittest.TestCase):
         client.publish(topic, payload)
         
         # Verify publish was called with correct parameters
-        mock_client_instance.publish.assert_called_once_with(topic, payload, qos=1)
-        mock_result.wait_for_publish.assert_called_once()
+        self.assertEqual(client.client.published, [(topic, payload, 1)])
+        self.assertTrue(client.client.results[0].waited)
     
-    @patch('paho.mqtt.client.Client')
-    def test_publish_not_connected(self, mock_mqtt_client):
+    def test_publish_async_does_not_wait(self):
+        """Test async publish returns the result without waiting for the ack."""
+        client = self.connected_client()
+        
+        topic = "msh/US/2/e/LongFast/!12345678"
+        result = client.publish_async(topic, b"test binary payload")
+        
+        self.assertIs(result, client.client.results[0])
+        self.assertEqual(client.client.published, [(topic, b"test binary payload", 1)])
+        self.assertFalse(result.waited)
+    
+    def test_publish_bytearray_payload(self):
+        """Test bytearray payloads are passed to paho without conversion."""
+        client = self.connected_client()
+        
+        payload = bytearray(b"test binary payload")
+        client.publish("msh/US/2/e/LongFast/!12345678", payload)
+        
+        self.assertIs(client.client.published[0][1], payload)
+    
+    def test_publish_bound_topic(self):
+        """Test publishing without a topic uses the bound topic."""
+        client = self.connected_client()
+        topic = client.bind_topic("US", "LongFast", "!12345678")
+        self.assertEqual(topic, "msh/US/2/e/LongFast/!12345678")
+        
+        client.publish(None, b"test binary payload")
+        
+        self.assertEqual(client.client.published, [(topic, b"test binary payload", 1)])
+    
+    def test_publish_many(self):
+        """Test publish_many queues every payload before waiting."""
+        client = self.connected_client()
+        
+        topic = "msh/US/2/e/LongFast/!12345678"
+        payloads = [b"first", b"second", b"third"]
+        client.publish_many(topic, payloads)
+        
+        self.assertEqual(
+            client.client.published,
+            [(topic, payload, 1) for payload in payloads]
+        )
+        self.assertEqual(client.client.events, ["publish"] * 3 + ["wait"] * 3)
+    
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_publish_compressed(self):
+        """Test large payloads are zstd-compressed to the /zstd topic."""
+        client = self.connected_client()
+        
+        topic = "msh/US/2/e/LongFast/!12345678"
+        payload = b"test binary payload " * 50
+        client.publish(topic, payload, compress=True)
+        
+        published_topic, published_payload, qos = client.client.published[0]
+        self.assertEqual(published_topic, topic + "/zstd")
+        self.assertEqual(published_payload[:1], b"\x1f")
+        self.assertLess(len(published_payload), len(payload))
+        self.assertEqual(
+            zstandard.ZstdDecompressor().decompress(published_payload[1:]),
+            payload
+        )
+    
+    def test_publish_compress_skips_small_payload(self):
+        """Test payloads too small to benefit are sent uncompressed."""
+        client = self.connected_client()
+        
+        topic = "msh/US/2/e/LongFast/!12345678"
+        client.publish(topic, b"test binary payload", compress=True)
+        
+        self.assertEqual(client.client.published, [(topic, b"test binary payload", 1)])
+    
+    def test_publish_not_connected(self):
         """Test publishing without connection raises error."""
         client = MeshtasticMQTTClient(
             self.server, self.port, self.username, self.password
@@ -142,23 +304,9 @@ class TestMeshtasticMQTTClient(unittest.TestCase):
         
         self.assertIn("Not connected", str(context.exception))
     
-    @patch('paho.mqtt.client.Client')
-    def test_publish_invalid_payload(self, mock_mqtt_client):
+    def test_publish_invalid_payload(self):
         """Test publishing non-bytes payload raises error."""
-        mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
-        
-        client = MeshtasticMQTTClient(
-            self.server, self.port, self.username, self.password
-        )
-        
-        # Simulate connection
-        def simulate_connect(*args, **kwargs):
-            if client.client and client.client.on_connect:
-                client.client.on_connect(None, None, None, 0)
-        
-        mock_client_instance.connect.side_effect = simulate_connect
-        client.connect(timeout=1)
+        client = self.connected_client()
         
         # Try to publish string instead of bytes
         with self.assertRaises(ValueError) as context:
@@ -166,33 +314,76 @@ class TestMeshtasticMQTTClient(unittest.TestCase):
         
         self.assertIn("must be bytes", str(context.exception))
     
-    @patch('paho.mqtt.client.Client')
-    def test_disconnect(self, mock_mqtt_client):
+    def test_disconnect(self):
         """Test clean disconnect from broker."""
-        mock_client_instance = MagicMock()
-        mock_mqtt_client.return_value = mock_client_instance
-        
-        client = MeshtasticMQTTClient(
-            self.server, self.port, self.username, self.password
-        )
-        
-        # Simulate connection
-        def simulate_connect(*args, **kwargs):
-            if client.client and client.client.on_connect:
-                client.client.on_connect(None, None, None, 0)
-        
-        mock_client_instance.connect.side_effect = simulate_connect
-        client.connect(timeout=1)
+        client = self.connected_client()
+        paho_client = client.client
         
         # Disconnect
         client.disconnect()
         
         # Verify disconnect was called
-        mock_client_instance.loop_stop.assert_called_once()
-        mock_client_instance.disconnect.assert_called_once()
+        self.assertEqual(paho_client.loop_stop_calls, 1)
+        self.assertEqual(paho_client.disconnect_calls, 1)
         self.assertFalse(client.connected)
         self.assertIsNone(client.client)
 
 
+class TestClientPool(unittest.TestCase):
+    """Test shared clients from get_or_create()."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.server = "mqtt.example.com"
+        self.port = 1883
+        self.username = "testuser"
+        self.password = "testpass"
+    
+    def tearDown(self):
+        """Clean up test fixtures."""
+        MeshtasticMQTTClient.shutdown_all()
+    
+    def test_same_broker_returns_same_client(self):
+        """Test repeated calls for one broker share a client."""
+        client1 = MeshtasticMQTTClient.get_or_create(
+            self.server, self.port, self.username, self.password
+        )
+        client2 = MeshtasticMQTTClient.get_or_create(
+            self.server, self.port, self.username, self.password
+        )
+        client3 = MeshtasticMQTTClient.get_or_create(
+            self.server, self.port, "otheruser", self.password
+        )
+        self.assertIs(client1, client2)
+        self.assertIsNot(client1, client3)
+    
+    def test_pooled_client_stays_connected(self):
+        """Test disconnect() keeps a pooled connection open for reuse."""
+        with fake_paho():
+            client = MeshtasticMQTTClient.get_or_create(
+                self.server, self.port, self.username, self.password
+            )
+            client.connect(timeout=1)
+            client.disconnect()
+            
+            # A second sender reuses the open connection
+            client = MeshtasticMQTTClient.get_or_create(
+                self.server, self.port, self.username, self.password
+            )
+            client.connect(timeout=1)
+            client.disconnect()
+        
+        paho_client = client.client
+        self.assertEqual(paho_client.connect_calls, 1)
+        self.assertEqual(paho_client.disconnect_calls, 0)
+        self.assertTrue(client.connected)
+        
+        # shutdown_all() closes it for real
+        MeshtasticMQTTClient.shutdown_all()
+        self.assertEqual(paho_client.loop_stop_calls, 1)
+        self.assertEqual(paho_client.disconnect_calls, 1)
+        self.assertFalse(client.connected)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,15 +5,24 @@ are compatible with the Meshtastic protocol specification and can be
 properly deserialized using the official meshtastic package.
 """
 
+import os
 import unittest
+from unittest.mock import patch
 from src.meshtastic_mqtt_protobuf.message import (
     build_protobuf_message,
     parse_node_id,
-    generate_packet_id
+    generate_packet_id,
+    MessageBuilder,
+    _serialize_text_envelope
 )
 
+# Parse with the native upb backend unless told otherwise; this must be set
+# before google.protobuf is first imported
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "upb")
+
 # Import protobuf modules
 from meshtastic import mesh_pb2, mqtt_pb2, portnums_pb2
+from google.protobuf.internal import api_implementation
 import meshtastic
 
 
@@ -47,6 +56,17 @@ class TestMeshtasticPackageVersion(unittest.TestCase):
         self.assertTrue(hasattr(portnums_pb2, 'PortNum'))
         self.assertTrue(hasattr(portnums_pb2.PortNum, 'TEXT_MESSAGE_APP'))
     
+    def test_native_protobuf_backend(self):
+        """Verify protobuf runs on a native backend, not pure Python."""
+        if os.environ.get('PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION') == 'python':
+            self.skipTest("pure-Python protobuf explicitly requested")
+        
+        # Requested above; protobuf>=4.21 wheels ship the upb C extension
+        self.assertEqual(
+            api_implementation.Type(),
+            os.environ['PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION']
+        )
+    
     def test_protobuf_field_compatibility(self):
         """Verify protobuf message fields match expected structure."""
         # Create a ServiceEnvelope
@@ -381,5 +401,91 @@ class TestProtobufBinaryFormat(unittest.TestCase):
         self.assertNotEqual(env1.packet.id, env2.packet.id)
 
 
+
+class TestHandWrittenEncoder(unittest.TestCase):
+    """Test the hand-written encoder against the official protobuf classes."""
+    
+    def _reference_bytes(self, text_bytes, from_node, to_node, pid, channel_idx,
+                         hop_limit, want_ack, channel, gateway_id):
+        """Serialize the same envelope with the meshtastic protobuf classes."""
+        envelope = mqtt_pb2.ServiceEnvelope()
+        setattr(envelope.packet, 'from', from_node)
+        envelope.packet.to = to_node
+        envelope.packet.id = pid
+        envelope.packet.channel = channel_idx
+        envelope.packet.hop_limit = hop_limit
+        envelope.packet.want_ack = want_ack
+        envelope.packet.decoded.portnum = portnums_pb2.PortNum.TEXT_MESSAGE_APP
+        envelope.packet.decoded.payload = text_bytes
+        envelope.channel_id = channel
+        envelope.gateway_id = gateway_id
+        return envelope.SerializeToString()
+    
+    def test_matches_serialize_to_string(self):
+        """Verify encoder output is byte-identical to SerializeToString()."""
+        test_cases = [
+            ("Hello", 0x12345678, 0xFFFFFFFF, 0x1234ABCD, 0, 3, False, "LongFast", "!12345678"),
+            ("Direct", 0xabcdef12, 0x87654321, 1, 0, 7, True, "ShortSlow", "!abcdef12"),
+            ("Hello 世界! 🌍", 0x12345678, 0xFFFFFFFF, 0xFFFFFFFF, 0, 0, False, "LongFast", "!12345678"),
+            ("A" * 300, 1, 2, 3, 5, 127, True, "LongFast", "!00000001"),
+            ("Zeros", 0, 0, 0, 0, 0, False, "", ""),
+            ("Big varint", 0x12345678, 0xFFFFFFFF, 42, 0xFFFFFFFF, 0xFFFFFFFF, True, "LongFast", "!12345678"),
+        ]
+        
+        for text, from_node, to_node, pid, channel_idx, hop_limit, want_ack, channel, gateway_id in test_cases:
+            with self.subTest(text=text[:20], hop_limit=hop_limit):
+                text_bytes = text.encode('utf-8')
+                expected = self._reference_bytes(
+                    text_bytes, from_node, to_node, pid, channel_idx,
+                    hop_limit, want_ack, channel, gateway_id
+                )
+                result = _serialize_text_envelope(
+                    text_bytes, from_node, to_node, pid, channel_idx,
+                    hop_limit, want_ack, channel.encode('utf-8'), gateway_id.encode('utf-8')
+                )
+                self.assertEqual(result, expected)
+                
+                # Writing into a reused buffer must give the same bytes
+                buf = bytearray(b"stale contents")
+                _serialize_text_envelope(
+                    text_bytes, from_node, to_node, pid, channel_idx,
+                    hop_limit, want_ack, channel.encode('utf-8'), gateway_id.encode('utf-8'),
+                    out=buf
+                )
+                self.assertEqual(buf, expected)
+    
+    @patch('src.meshtastic_mqtt_protobuf.message.generate_packet_id', return_value=0x1234ABCD)
+    def test_builder_matches_serialize_to_string(self, mock_packet_id):
+        """Verify MessageBuilder's pre-encoded fields give identical bytes."""
+        test_cases = [
+            ("!12345678", "LongFast", "^all", 3, False),
+            ("!abcdef12", "ShortSlow", "!87654321", 7, True),
+            ("!00000000", "", "^all", 0, False),
+        ]
+        
+        for gateway_id, channel, to_id, hop_limit, want_ack in test_cases:
+            with self.subTest(gateway_id=gateway_id, channel=channel):
+                builder = MessageBuilder(gateway_id, channel)
+                expected = self._reference_bytes(
+                    "Hello".encode('utf-8'), parse_node_id(gateway_id),
+                    parse_node_id(to_id), 0x1234ABCD, 0,
+                    hop_limit, want_ack, channel, gateway_id
+                )
+                result = builder.build(
+                    "Hello", to_id, want_ack=want_ack, hop_limit=hop_limit
+                )
+                self.assertEqual(result, expected)
+    
+    def test_out_of_range_node_id_rejected(self):
+        """Verify node IDs that do not fit in 32 bits raise ValueError."""
+        with self.assertRaises(ValueError):
+            build_protobuf_message(
+                text="Test",
+                to_id="!1ffffffff",
+                gateway_id="!12345678",
+                channel="LongFast"
+            )
+
+
 if __name__ == '__main__':
     unittest.main()